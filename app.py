@@ -5,10 +5,16 @@ Streamlit app for real-time NBL team ratings with FlashScore integration
 
 import streamlit as st
 import pandas as pd
-import json
+import orjson
+import hashlib
+import copy
 from datetime import datetime
 import os
-from utils.scraper import FlashScoreScraper
+from collections import deque
+from itertools import islice
+import plotly.express as px
+import plotly.graph_objects as go
+from utils.scraper import FlashScoreScraper, ScrapeError
 from utils.ratings import RatingSystem
 
 # Page configuration
@@ -19,32 +25,156 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+GAME_HISTORY_CSV = 'data/game_history.csv'
+
+# Column schema of the history CSV (timestamp is parsed as a date)
+GAME_HISTORY_DTYPES = {
+    'home': 'string',
+    'away': 'string',
+    'home_score': 'int16',
+    'away_score': 'int16',
+    'home_rating_before': 'float64',
+    'away_rating_before': 'float64',
+    'home_rating_after': 'float64',
+    'away_rating_after': 'float64',
+    'expected_mov': 'float64',
+    'actual_mov': 'int16',
+    'delta_rating': 'float64',
+    'home_team_full': 'string',
+    'away_team_full': 'string',
+    'k': 'float64',
+    'home_adv': 'float64'
+}
+
+try:
+    import pyarrow  # noqa: F401
+    CSV_ENGINE = 'pyarrow'
+except ImportError:  # pyarrow is optional; use pandas' C parser
+    CSV_ENGINE = 'c'
+
+@st.cache_data(show_spinner=False)
+def _load_json(path, mtime):
+    """Parse a JSON file; mtime is only part of the cache key"""
+    with open(path, 'rb') as f:
+        return orjson.loads(f.read())
+
 def load_initial_data():
     """Load initial ratings and team mapping"""
-    with open('data/initial_ratings.json', 'r') as f:
-        initial_ratings = json.load(f)
-    with open('data/team_mapping.json', 'r') as f:
-        team_mapping = json.load(f)
+    initial_ratings = _load_json('data/initial_ratings.json',
+                                 os.path.getmtime('data/initial_ratings.json'))
+    team_mapping = _load_json('data/team_mapping.json',
+                              os.path.getmtime('data/team_mapping.json'))
     return initial_ratings, team_mapping
 
-def save_game_history(history):
-    """Save game history to CSV"""
-    if history:
+@st.cache_resource(max_entries=1)
+def get_rating_system(ratings_mtime, mapping_mtime):
+    """Read-only template rating system; sessions work on a copy
+    
+    The data file mtimes key the cache, so editing either file rebuilds it.
+    """
+    initial_ratings, team_mapping = load_initial_data()
+    rs = RatingSystem(initial_ratings, team_mapping)
+    # Team picker options for the manual entry form, computed once
+    rs.team_choices = tuple(islice(team_mapping, 10))
+    return rs
+
+def new_rating_system(games_df=None):
+    """Session-private rating system, replayed from the given history"""
+    rs = copy.deepcopy(get_rating_system(
+        os.path.getmtime('data/initial_ratings.json'),
+        os.path.getmtime('data/team_mapping.json')
+    ))
+    if games_df is not None and not games_df.empty:
+        rs.replay_batch(games_df)
+    return rs
+
+def _csv_columns():
+    """Column names from the history CSV header"""
+    with open(GAME_HISTORY_CSV, 'r') as f:
+        return f.readline().rstrip('\n').split(',')
+
+def append_game(row):
+    """Append a single game to the history CSV"""
+    df = pd.DataFrame([row])
+    if not os.path.exists(GAME_HISTORY_CSV):
+        df.to_csv(GAME_HISTORY_CSV, index=False)
+        return
+    # Keep the existing file's column layout (older files lack k/home_adv)
+    df.reindex(columns=_csv_columns()).to_csv(GAME_HISTORY_CSV, mode='a', header=False, index=False)
+
+def save_game_history_full(history):
+    """Rewrite the whole history CSV (used on reset)"""
+    if len(history):
         df = pd.DataFrame(history)
-        df.to_csv('data/game_history.csv', index=False)
+        df.to_csv(GAME_HISTORY_CSV, index=False)
+    elif os.path.exists(GAME_HISTORY_CSV):
+        os.remove(GAME_HISTORY_CSV)
 
 def load_game_history():
     """Load game history from CSV"""
-    if os.path.exists('data/game_history.csv'):
-        return pd.read_csv('data/game_history.csv').to_dict('records')
-    return []
+    if os.path.exists(GAME_HISTORY_CSV):
+        columns = _csv_columns()
+        dtypes = {col: t for col, t in GAME_HISTORY_DTYPES.items() if col in columns}
+        return pd.read_csv(GAME_HISTORY_CSV, dtype=dtypes,
+                           engine=CSV_ENGINE, parse_dates=['timestamp'])
+    return pd.DataFrame()
+
+def _to_history_frame(rows):
+    """Build a DataFrame of games using the history CSV schema"""
+    df = pd.DataFrame(rows)
+    df = df.astype({col: t for col, t in GAME_HISTORY_DTYPES.items() if col in df})
+    if 'timestamp' in df:
+        df['timestamp'] = pd.to_datetime(df['timestamp'])
+    return df
+
+def record_game(result):
+    """Add a played game to the session history and the CSV"""
+    row = _to_history_frame([result])
+    df = st.session_state.games_df
+    st.session_state.games_df = row if df.empty else pd.concat([df, row], ignore_index=True)
+    st.session_state.recent.extend(row.to_dict('records'))
+    append_game(result)
+
+def mapping_hash(team_mapping):
+    """Stable hash of the team mapping, used as a cache key"""
+    return hashlib.md5(orjson.dumps(team_mapping, option=orjson.OPT_SORT_KEYS)).hexdigest()
+
+@st.cache_data(ttl=300, show_spinner=False)
+def _cached_scrape(mapping_key, _team_mapping):
+    """Scrape FlashScore, reusing the result for 5 minutes per team mapping
+    
+    Failed scrapes raise ScrapeError, which Streamlit does not cache.
+    """
+    return FlashScoreScraper(_team_mapping).scrape(fallback=False)
+
+@st.cache_data(max_entries=8, show_spinner=False)
+def build_trend_fig(history):
+    """Rating change line chart for (home, away, delta_rating) tuples"""
+    df_trend = pd.DataFrame(history, columns=['Home Team', 'Away Team', 'Home Δ'])
+    df_trend['Away Δ'] = -df_trend['Home Δ']
+    df_trend.insert(0, 'Game', range(1, len(df_trend) + 1))
+    return px.line(df_trend, x='Game', y=['Home Δ', 'Away Δ'],
+                   title="Rating Changes Over Games")
+
+@st.cache_data(max_entries=8, show_spinner=False)
+def build_distribution_fig(ratings):
+    """Histogram of a tuple of team ratings"""
+    fig = go.Figure(data=[go.Histogram(x=list(ratings), nbinsx=10)])
+    fig.update_layout(
+        title="Rating Distribution",
+        xaxis_title="Rating",
+        yaxis_title="Count"
+    )
+    return fig
 
 def main():
     # Initialize session state
     if 'ratings_system' not in st.session_state:
-        initial_ratings, team_mapping = load_initial_data()
-        st.session_state.ratings_system = RatingSystem(initial_ratings, team_mapping)
-        st.session_state.game_history = load_game_history()
+        st.session_state.games_df = load_game_history()
+        st.session_state.ratings_system = new_rating_system(st.session_state.games_df)
+        st.session_state.recent = deque(
+            st.session_state.games_df.tail(10).to_dict('records'), maxlen=10
+        )
         st.session_state.last_scrape = None
     
     # Title and header
@@ -60,22 +190,26 @@ def main():
         
         st.header("⚙️ Configuration")
         
-        # Parameters
-        k_value = st.slider(
-            "K-factor (rating change sensitivity)",
-            min_value=0.01, max_value=0.2,
-            value=st.session_state.ratings_system.k, step=0.01
-        )
-        
-        home_adv = st.slider(
-            "Home Court Advantage",
-            min_value=0.0, max_value=5.0,
-            value=st.session_state.ratings_system.home_adv, step=0.1
-        )
+        # Parameters (applied on submit only, so dragging doesn't rerun the app)
+        with st.form("params"):
+            k_value = st.slider(
+                "K-factor (rating change sensitivity)",
+                min_value=0.01, max_value=0.2,
+                value=st.session_state.ratings_system.k, step=0.01
+            )
+            
+            home_adv = st.slider(
+                "Home Court Advantage",
+                min_value=0.0, max_value=5.0,
+                value=st.session_state.ratings_system.home_adv, step=0.1
+            )
+            
+            submitted = st.form_submit_button("Apply", use_container_width=True)
         
         # Update parameters
-        st.session_state.ratings_system.k = k_value
-        st.session_state.ratings_system.home_adv = home_adv
+        if submitted:
+            st.session_state.ratings_system.k = k_value
+            st.session_state.ratings_system.home_adv = home_adv
         
         st.divider()
         
@@ -86,12 +220,12 @@ def main():
             with col1:
                 home_team = st.selectbox(
                     "Home Team",
-                    options=list(st.session_state.ratings_system.team_mapping.keys())[:10]
+                    options=st.session_state.ratings_system.team_choices
                 )
             with col2:
                 away_team = st.selectbox(
                     "Away Team",
-                    options=list(st.session_state.ratings_system.team_mapping.keys())[:10]
+                    options=st.session_state.ratings_system.team_choices
                 )
             
             home_score = st.number_input("Home Score", min_value=0, max_value=200, value=90)
@@ -101,8 +235,7 @@ def main():
                 result = st.session_state.ratings_system.play_game(
                     home_team, away_team, home_score, away_score
                 )
-                st.session_state.game_history.append(result)
-                save_game_history(st.session_state.game_history)
+                record_game(result)
                 st.success(f"Game added! {home_team} {home_score}-{away_score} {away_team}")
                 st.rerun()
         
@@ -114,10 +247,10 @@ def main():
         col_reset, col_export = st.columns(2)
         with col_reset:
             if st.button("🔄 Reset", use_container_width=True):
-                initial_ratings, _ = load_initial_data()
-                st.session_state.ratings_system = RatingSystem(initial_ratings)
-                st.session_state.game_history = []
-                save_game_history([])
+                save_game_history_full([])
+                st.session_state.ratings_system = new_rating_system()
+                st.session_state.games_df = pd.DataFrame()
+                st.session_state.recent.clear()
                 st.rerun()
         
         with col_export:
@@ -126,15 +259,15 @@ def main():
                 export_data = {
                     "timestamp": datetime.now().isoformat(),
                     "parameters": {
-                        "k": k_value,
-                        "home_advantage": home_adv
+                        "k": st.session_state.ratings_system.k,
+                        "home_advantage": st.session_state.ratings_system.home_adv
                     },
-                    "ratings": st.session_state.ratings_system.ratings,
-                    "games_played": len(st.session_state.game_history)
+                    "ratings": dict(st.session_state.ratings_system.ratings),
+                    "games_played": len(st.session_state.games_df)
                 }
                 st.download_button(
                     label="Download JSON",
-                    data=json.dumps(export_data, indent=2),
+                    data=orjson.dumps(export_data, option=orjson.OPT_INDENT_2),
                     file_name=f"nbl_ratings_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
                     mime="application/json"
                 )
@@ -155,31 +288,34 @@ def main():
             with col_fetch:
                 if st.button("🚀 Scrape Latest Results", use_container_width=True):
                     with st.spinner("Fetching data from FlashScore..."):
-                        scraper = FlashScoreScraper(st.session_state.ratings_system.team_mapping)
-                        new_games = scraper.scrape()
+                        team_mapping = st.session_state.ratings_system.team_mapping
+                        try:
+                            new_games = _cached_scrape(mapping_hash(team_mapping), team_mapping)
+                        except ScrapeError as e:
+                            new_games = e.fallback_games
                         
                         if new_games:
                             added_count = 0
+                            df = st.session_state.games_df
+                            seen = set() if df.empty else set(zip(
+                                df['home'], df['away'], df['home_score'], df['away_score']
+                            ))
                             for game in new_games:
-                                # Check if game already exists
-                                game_exists = any(
-                                    g.get('home') == game['home'] and 
-                                    g.get('away') == game['away'] and 
-                                    g.get('home_score') == game['home_score'] and 
-                                    g.get('away_score') == game['away_score']
-                                    for g in st.session_state.game_history
-                                )
+                                # Skip games we already have
+                                key = (game['home'], game['away'],
+                                       game['home_score'], game['away_score'])
+                                if key in seen:
+                                    continue
+                                seen.add(key)
                                 
-                                if not game_exists:
-                                    result = st.session_state.ratings_system.play_game(
-                                        game['home'], game['away'],
-                                        game['home_score'], game['away_score']
-                                    )
-                                    st.session_state.game_history.append(result)
-                                    added_count += 1
+                                result = st.session_state.ratings_system.play_game(
+                                    game['home'], game['away'],
+                                    game['home_score'], game['away_score']
+                                )
+                                record_game(result)
+                                added_count += 1
                             
                             if added_count > 0:
-                                save_game_history(st.session_state.game_history)
                                 st.success(f"✅ Added {added_count} new games!")
                                 st.session_state.last_scrape = datetime.now()
                                 st.rerun()
@@ -194,21 +330,17 @@ def main():
         
         with manual_tab:
             # Recent games table
-            if st.session_state.game_history:
+            if st.session_state.recent:
                 st.subheader("Recent Games")
-                recent_games = st.session_state.game_history[-10:]
-                
-                games_data = []
-                for game in recent_games:
-                    games_data.append({
-                        "Date": game.get('timestamp', 'N/A'),
-                        "Match": f"{game['home']} vs {game['away']}",
-                        "Score": f"{game['home_score']} - {game['away_score']}",
-                        "Δ Rating": f"{game.get('delta_rating', 0):+.2f}"
-                    })
+                recent_games = pd.DataFrame(st.session_state.recent).assign(**{
+                    "Date": lambda d: d.timestamp,
+                    "Match": lambda d: d.home + ' vs ' + d.away,
+                    "Score": lambda d: d.home_score.astype(str) + ' - ' + d.away_score.astype(str),
+                    "Δ Rating": lambda d: d.delta_rating.map('{:+.2f}'.format)
+                })
                 
                 st.dataframe(
-                    pd.DataFrame(games_data),
+                    recent_games[["Date", "Match", "Score", "Δ Rating"]],
                     use_container_width=True,
                     hide_index=True
                 )
@@ -256,59 +388,36 @@ def main():
     tab1, tab2, tab3 = st.tabs(["📈 Ratings Trend", "🎯 Distribution", "📋 Game Log"])
     
     with tab1:
-        if len(st.session_state.game_history) > 1:
-            # Create rating trend chart
-            import plotly.express as px
-            
-            # Prepare data for visualization
-            trend_data = []
-            for game in st.session_state.game_history:
-                trend_data.append({
-                    'Game': len(trend_data) + 1,
-                    'Home Team': game['home'],
-                    'Home Δ': game.get('delta_rating', 0),
-                    'Away Team': game['away'],
-                    'Away Δ': -game.get('delta_rating', 0)
-                })
-            
-            if trend_data:
-                df_trend = pd.DataFrame(trend_data)
-                fig = px.line(df_trend, x='Game', y=['Home Δ', 'Away Δ'],
-                            title="Rating Changes Over Games")
-                st.plotly_chart(fig, use_container_width=True)
+        if len(st.session_state.games_df) > 1:
+            # Create rating trend chart, keyed on an immutable view of the history
+            games_df = st.session_state.games_df
+            history = tuple(zip(games_df['home'], games_df['away'],
+                                games_df['delta_rating'].fillna(0).tolist()))
+            st.plotly_chart(build_trend_fig(history), use_container_width=True)
         else:
             st.info("Play more games to see rating trends.")
     
     with tab2:
         # Rating distribution
-        import plotly.graph_objects as go
-        
-        ratings_list = list(st.session_state.ratings_system.ratings.values())
-        
-        fig = go.Figure(data=[go.Histogram(x=ratings_list, nbinsx=10)])
-        fig.update_layout(
-            title="Rating Distribution",
-            xaxis_title="Rating",
-            yaxis_title="Count"
-        )
-        st.plotly_chart(fig, use_container_width=True)
+        ratings = tuple(st.session_state.ratings_system.rating_values.tolist())
+        st.plotly_chart(build_distribution_fig(ratings), use_container_width=True)
     
     with tab3:
         # Full game log
-        if st.session_state.game_history:
-            full_log = []
-            for game in st.session_state.game_history:
-                full_log.append({
-                    "Home": game['home'],
-                    "Away": game['away'],
-                    "Score": f"{game['home_score']}-{game['away_score']}",
-                    "Home Rating": f"{game.get('home_rating_before', 0):.2f} → {game.get('home_rating_after', 0):.2f}",
-                    "Away Rating": f"{game.get('away_rating_before', 0):.2f} → {game.get('away_rating_after', 0):.2f}",
-                    "Δ Rating": f"{game.get('delta_rating', 0):+.2f}"
-                })
+        if not st.session_state.games_df.empty:
+            fmt = '{:.2f}'.format
+            d = st.session_state.games_df.iloc[::-1]  # Reverse to show latest first
+            full_log = pd.DataFrame({
+                "Home": d.home,
+                "Away": d.away,
+                "Score": d.home_score.astype(str) + '-' + d.away_score.astype(str),
+                "Home Rating": d.home_rating_before.map(fmt) + ' → ' + d.home_rating_after.map(fmt),
+                "Away Rating": d.away_rating_before.map(fmt) + ' → ' + d.away_rating_after.map(fmt),
+                "Δ Rating": d.delta_rating.map('{:+.2f}'.format)
+            })
             
             st.dataframe(
-                pd.DataFrame(full_log).iloc[::-1],  # Reverse to show latest first
+                full_log,
                 use_container_width=True,
                 height=400
             )
@@ -0,0 +1,88 @@
+"""
+Tests for the rating system
+"""
+
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'utils', 'utils'))
+
+from ratings import RatingSystem
+
+INITIAL_RATINGS = {'36': 1.04, 'syd': -0.5, 'mel': 2.3, 'per': 0.0}
+
+GAMES = [
+    ('36', 'syd', 85, 79),
+    ('mel', 'per', 92, 101),
+    ('syd', 'mel', 77, 88),
+    ('per', '36', 95, 90),
+    ('new', 'syd', 80, 82),  # team not in the initial ratings
+    ('36', 'mel', 103, 99),
+]
+
+
+def test_replay_batch_matches_play_game():
+    live = RatingSystem(dict(INITIAL_RATINGS))
+    for home, away, home_score, away_score in GAMES:
+        live.play_game(home, away, home_score, away_score)
+    
+    replayed = RatingSystem(dict(INITIAL_RATINGS))
+    replayed.replay_batch(pd.DataFrame(
+        GAMES, columns=['home', 'away', 'home_score', 'away_score']
+    ))
+    
+    assert replayed.ratings.keys() == live.ratings.keys()
+    for team, rating in live.ratings.items():
+        assert replayed.ratings[team] == pytest.approx(rating, abs=1e-6)
+
+
+def test_replay_batch_empty_is_noop():
+    rs = RatingSystem(dict(INITIAL_RATINGS))
+    rs.replay_batch(pd.DataFrame(columns=['home', 'away', 'home_score', 'away_score']))
+    assert rs.ratings == INITIAL_RATINGS
+
+
+def test_replay_batch_uses_recorded_parameters():
+    live = RatingSystem(dict(INITIAL_RATINGS), k=0.1, home_adv=3.0)
+    for n, (home, away, home_score, away_score) in enumerate(GAMES):
+        if n == 3:
+            live.k, live.home_adv = 0.02, 1.5  # parameters re-applied mid-season
+        live.play_game(home, away, home_score, away_score)
+    
+    # A fresh system with default parameters, as on a cold start
+    replayed = RatingSystem(dict(INITIAL_RATINGS))
+    replayed.replay_batch(pd.DataFrame(live.game_history))
+    
+    for team, rating in live.ratings.items():
+        assert replayed.ratings[team] == pytest.approx(rating, abs=1e-6)
+    assert replayed.ratings['36'] == live.game_history[-1].home_rating_after
+
+
+def test_public_values_are_rounded():
+    rs = RatingSystem(dict(INITIAL_RATINGS))
+    assert rs.ratings['36'] == 1.04
+    assert rs.get_team_rating('36') == 1.04
+    assert dict(rs.get_standings())['36'] == 1.04
+    prediction = rs.predict_game('36', 'syd')
+    assert prediction['home_rating'] == 1.04
+    assert prediction['expected_mov'] == round(1.04 + 2.2 + 0.5, 6)
+
+
+def test_ratings_view_is_read_only():
+    rs = RatingSystem(dict(INITIAL_RATINGS))
+    with pytest.raises(TypeError):
+        rs.ratings['36'] = 99
+
+
+def test_play_game_fast_matches_play_game():
+    recorded = RatingSystem(dict(INITIAL_RATINGS), k=0.08)
+    fast = RatingSystem(dict(INITIAL_RATINGS), k=0.08)
+    for home, away, home_score, away_score in GAMES:
+        result = recorded.play_game(home, away, home_score, away_score)
+        assert fast.play_game_fast(home, away, home_score, away_score) == result.delta_rating
+    
+    assert fast.ratings == recorded.ratings
+    assert fast.game_history == []
@@ -0,0 +1,76 @@
+"""
+Tests for FlashScore HTML parsing
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'utils'))
+
+import scraper
+from scraper import FlashScoreScraper
+
+TEAM_MAPPING = {'Adelaide 36ers': '36', 'Sydney Kings': 'syd', 'Perth Wildcats': 'per'}
+
+# Regular results page: an outer 'event' wrapper around event__match rows,
+# plus a header row without scores
+EVENT_MATCH_HTML = """
+<div class="sportName basketball event--leagues">
+  <div class="event__header">NBL - Round 1</div>
+  <div class="event__match event__match--static">
+    <div class="event__participant event__participant--home">Adelaide 36ers</div>
+    <div class="event__participant event__participant--away">Sydney Kings</div>
+    <div class="event__score">85 - 79</div>
+  </div>
+  <div class="event__match event__match--static">
+    <div class="event__participant event__participant--home">Perth Wildcats</div>
+    <div class="event__participant event__participant--away">Adelaide 36ers</div>
+    <div class="event__score">101:92</div>
+  </div>
+</div>
+"""
+
+# No event__match rows: games sit in 'match' divs inside an 'event' wrapper,
+# which must not be parsed as a game of its own
+MATCH_ROW_HTML = """
+<div class="event-wrapper">
+  <div class="match-row">
+    <span class="team-home">Sydney Kings</span>
+    <span class="team-away">Perth Wildcats</span>
+    <span class="score">88</span><span class="score">90</span>
+  </div>
+  <div class="match-row">
+    <span class="team-home">Adelaide 36ers</span>
+    <span class="team-away">Perth Wildcats</span>
+    <span class="score">77 - 70</span>
+  </div>
+</div>
+"""
+
+
+@pytest.fixture(params=['selectolax', 'beautifulsoup'])
+def parser(request, monkeypatch):
+    """FlashScoreScraper using each HTML backend in turn"""
+    if request.param == 'selectolax':
+        if scraper.HTMLParser is None:
+            pytest.skip("selectolax is not installed")
+    else:
+        monkeypatch.setattr(scraper, 'HTMLParser', None)
+    return FlashScoreScraper(TEAM_MAPPING)
+
+
+def _summary(games):
+    return [(g['home'], g['away'], g['home_score'], g['away_score']) for g in games]
+
+
+def test_parse_event_match_rows(parser):
+    games = parser._parse_html(EVENT_MATCH_HTML)
+    assert _summary(games) == [('36', 'syd', 85, 79), ('per', '36', 101, 92)]
+    assert games[0]['home_team_full'] == 'Adelaide 36ers'
+
+
+def test_parse_match_rows_skips_event_wrapper(parser):
+    games = parser._parse_html(MATCH_ROW_HTML)
+    assert _summary(games) == [('syd', 'per', 88, 90), ('36', 'per', 77, 70)]
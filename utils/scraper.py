@@ -2,53 +2,220 @@
 FlashScore scraper module for fetching NBL game results
 """
 
-import requests
+import asyncio
+import atexit
+import httpx
 import re
+import threading
 from bs4 import BeautifulSoup
 import time
 from datetime import datetime
 
+try:
+    # The lexbor backend; selectolax 1.0 removed the old Modest HTMLParser
+    from selectolax.lexbor import LexborHTMLParser as HTMLParser
+except ImportError:  # selectolax is optional; fall back to BeautifulSoup + lxml
+    HTMLParser = None
+
+# Upper bound on in-flight requests when fanning out over several pages
+MAX_CONCURRENT_REQUESTS = 10
+
+# Match container selectors, in order of preference, queried as one group
+MATCH_SELECTOR = 'div.event__match, div[class*="match"], div[class*="event"]'
+MATCH_CLASS_TESTS = [
+    lambda cls: 'event__match' in cls.split(),
+    lambda cls: 'match' in cls,
+    lambda cls: 'event' in cls
+]
+
+def _has_digit(text):
+    """Cheap pre-filter: a match element without digits can't carry a score"""
+    return any(ch.isdigit() for ch in text)
+
+# Regex fallback patterns: "Home Away 8579" and "Home 85 Away 79"
+FALLBACK_PATTERNS = [
+    re.compile(r'([A-Za-z\s\.]+)\s+([A-Za-z\s\.]+)\s+(\d{2,3})(\d{2,3})'),
+    re.compile(r'([A-Za-z\s]+)\s+(\d{1,3})\s+([A-Za-z\s]+)\s+(\d{1,3})')
+]
+
+class ScrapeError(Exception):
+    """Raised when no page could be fetched; carries the sample fallback games"""
+    
+    def __init__(self, message, fallback_games):
+        super().__init__(message)
+        self.fallback_games = fallback_games
+
+class RateLimiter:
+    """Token-bucket rate limiter for async requests, safe to share across threads"""
+    
+    def __init__(self, requests_per_second=5, burst=None):
+        self.rate = requests_per_second
+        self.capacity = burst or requests_per_second
+        self._tokens = self.capacity
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+    
+    async def acquire(self):
+        """Wait until a request slot is available"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            # Reserve a token up front; a negative balance is the queue of waiters
+            self._tokens -= 1
+            wait = -self._tokens / self.rate
+        if wait > 0:
+            await asyncio.sleep(wait)
+
 class FlashScoreScraper:
+    _HOME_RE = re.compile(r'.*home.*', re.I)
+    _AWAY_RE = re.compile(r'.*away.*', re.I)
+    _SCORE_RE = re.compile(r'(\d{1,3})\s*[-:]\s*(\d{1,3})')
+    _SCORE_CLASS_RE = re.compile(r'.*score.*', re.I)
+    
+    HEADERS = {
+        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+    }
+    
+    _client = None  # Keep-alive HTTP/2 client shared by all instances
+    _client_lock = threading.Lock()
+    _atexit_registered = False
+    # One limiter per process so repeated clicks and sessions share the budget
+    limiter = RateLimiter(requests_per_second=5)
+    
     def __init__(self, team_mapping):
         self.team_mapping = team_mapping
         self.url = "https://www.flashscoreusa.com/basketball/australia/nbl/results/"
-        self.headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-        }
+        self.urls = [self.url]
+        self.max_retries = 3
+        self.backoff = 1.0  # Base delay in seconds, doubled on each retry
+        self.client = self._shared_client()
+    
+    @classmethod
+    def _shared_client(cls):
+        """Return the process-wide HTTP client, creating it on first use"""
+        with cls._client_lock:
+            if cls._client is None:
+                cls._client = httpx.Client(
+                    headers=cls.HEADERS, http2=True, timeout=15,
+                    limits=httpx.Limits(max_keepalive_connections=MAX_CONCURRENT_REQUESTS)
+                )
+                if not cls._atexit_registered:
+                    atexit.register(cls.close)
+                    cls._atexit_registered = True
+            return cls._client
+    
+    @classmethod
+    def close(cls):
+        """Close the shared HTTP client"""
+        with cls._client_lock:
+            if cls._client is not None:
+                cls._client.close()
+                cls._client = None
     
-    def scrape(self):
+    def scrape(self, urls=None, fallback=True):
         """Main scraping method"""
+        return asyncio.run(self.scrape_async(urls, fallback))
+    
+    async def scrape_async(self, urls=None, fallback=True):
+        """Fetch all result pages concurrently and parse them
+        
+        If every fetch fails, returns sample data, or raises ScrapeError
+        when fallback is False.
+        """
+        urls = urls or self.urls
+        # Created per run: asyncio.run() starts a fresh event loop each call
+        semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+        
+        async def _fetch(url):
+            async with semaphore:
+                return await self._fetch_with_retry(url)
+        
+        responses = await asyncio.gather(
+            *[_fetch(url) for url in urls], return_exceptions=True
+        )
+        
+        games = []
+        fetched = False
+        for url, response in zip(urls, responses):
+            if isinstance(response, Exception):
+                print(f"Scraping error ({url}): {response}")
+                continue
+            fetched = True
+            games.extend(self._parse_page(response.text))
+        
+        if not fetched:
+            if not fallback:
+                raise ScrapeError("All FlashScore requests failed",
+                                  self._get_fallback_data())
+            return self._get_fallback_data()
+        return games
+    
+    async def _fetch_with_retry(self, url):
+        """GET a URL, retrying transient failures with exponential backoff
+        
+        Network errors, 429 and 5xx responses are retried; other HTTP
+        errors (e.g. 403/404) are raised immediately.
+        """
+        for attempt in range(self.max_retries):
+            try:
+                await self.limiter.acquire()
+                # The shared client is sync (it outlives each asyncio.run loop),
+                # so requests run in worker threads over its connection pool
+                response = await asyncio.to_thread(self.client.get, url)
+                response.raise_for_status()
+                return response
+            except httpx.HTTPStatusError as e:
+                status = e.response.status_code
+                if status != 429 and status < 500:
+                    raise
+                if attempt == self.max_retries - 1:
+                    raise
+            except httpx.TransportError:
+                if attempt == self.max_retries - 1:
+                    raise
+            await asyncio.sleep(self.backoff * 2 ** attempt)
+    
+    def _parse_page(self, html_content):
+        """Parse a single results page, falling back to regex parsing"""
         try:
-            response = requests.get(self.url, headers=self.headers, timeout=15)
-            response.raise_for_status()
-            
-            games = self._parse_html(response.text)
+            games = self._parse_html(html_content)
             if not games:
-                games = self._parse_fallback(response.text)
-            
+                games = self._parse_fallback(html_content)
             return games
-            
         except Exception as e:
-            print(f"Scraping error: {e}")
-            return self._get_fallback_data()
+            print(f"Parsing error: {e}")
+            return []
     
     def _parse_html(self, html_content):
-        """Parse HTML using BeautifulSoup"""
-        soup = BeautifulSoup(html_content, 'html.parser')
+        """Parse HTML using selectolax, or BeautifulSoup if unavailable"""
+        if HTMLParser is not None:
+            matches = HTMLParser(html_content).css(MATCH_SELECTOR)
+            extract = self._extract_game_from_node
+            node_key = lambda node: node.mem_id
+            node_class = lambda node: node.attributes.get('class') or ''
+        else:
+            matches = BeautifulSoup(html_content, 'lxml').select(MATCH_SELECTOR)
+            extract = self._extract_game_from_element
+            node_key = id
+            node_class = lambda node: ' '.join(node.get('class', []))
         games = []
         
-        # Method 1: Look for match containers
-        match_selectors = [
-            'div.event__match',
-            'div[class*="match"]',
-            'div[class*="event"]'
-        ]
+        # Method 1: Look for match containers. The DOM is walked once; hits are
+        # then narrowed to the most specific selector that matched anything.
+        seen = set()
+        unique = []
+        for match in matches:
+            key = node_key(match)
+            if key not in seen:
+                seen.add(key)
+                unique.append(match)
         
-        for selector in match_selectors:
-            matches = soup.select(selector)
-            if matches:
-                for match in matches:
-                    game = self._extract_game_from_element(match)
+        for test in MATCH_CLASS_TESTS:
+            hits = [match for match in unique if test(node_class(match))]
+            if hits:
+                for match in hits:
+                    game = extract(match)
                     if game:
                         games.append(game)
                 break
@@ -58,9 +225,13 @@ class FlashScoreScraper:
     def _extract_game_from_element(self, element):
         """Extract game data from HTML element"""
         try:
+            text = element.get_text()
+            if not _has_digit(text):
+                return None
+            
             # Try different class patterns
-            home_elem = element.find(class_=re.compile(r'.*home.*', re.I))
-            away_elem = element.find(class_=re.compile(r'.*away.*', re.I))
+            home_elem = element.find(class_=self._HOME_RE)
+            away_elem = element.find(class_=self._AWAY_RE)
             
             if not home_elem or not away_elem:
                 return None
@@ -69,51 +240,79 @@ class FlashScoreScraper:
             away_team = away_elem.get_text(strip=True)
             
             # Find scores
-            score_pattern = re.compile(r'(\d{1,3})\s*[-:]\s*(\d{1,3})')
-            text = element.get_text()
-            scores = score_pattern.search(text)
+            scores = self._SCORE_RE.search(text)
             
             if scores:
                 home_score = int(scores.group(1))
                 away_score = int(scores.group(2))
             else:
                 # Try to find score elements
-                score_elems = element.find_all(class_=re.compile(r'.*score.*', re.I))
+                score_elems = element.find_all(class_=self._SCORE_CLASS_RE)
                 if len(score_elems) >= 2:
                     home_score = int(score_elems[0].get_text(strip=True))
                     away_score = int(score_elems[1].get_text(strip=True))
                 else:
                     return None
             
-            # Map team names to our codes
-            home_code = self.team_mapping.get(home_team, home_team)
-            away_code = self.team_mapping.get(away_team, away_team)
+            return self._make_game(home_team, away_team, home_score, away_score)
             
-            return {
-                'home': home_code,
-                'away': away_code,
-                'home_score': home_score,
-                'away_score': away_score,
-                'home_team_full': home_team,
-                'away_team_full': away_team,
-                'scraped_at': datetime.now().isoformat()
-            }
+        except Exception:
+            return None
+    
+    def _extract_game_from_node(self, node):
+        """Extract game data from a selectolax node"""
+        try:
+            text = node.text()
+            if not _has_digit(text):
+                return None
+            
+            home_elem = node.css_first('[class*="home"]')
+            away_elem = node.css_first('[class*="away"]')
+            
+            if home_elem is None or away_elem is None:
+                return None
+            
+            home_team = home_elem.text(strip=True)
+            away_team = away_elem.text(strip=True)
+            
+            # Find scores
+            scores = self._SCORE_RE.search(text)
+            
+            if scores:
+                home_score = int(scores.group(1))
+                away_score = int(scores.group(2))
+            else:
+                score_elems = node.css('[class*="score"]')
+                if len(score_elems) >= 2:
+                    home_score = int(score_elems[0].text(strip=True))
+                    away_score = int(score_elems[1].text(strip=True))
+                else:
+                    return None
+            
+            return self._make_game(home_team, away_team, home_score, away_score)
             
         except Exception:
             return None
     
+    def _make_game(self, home_team, away_team, home_score, away_score):
+        """Build a scraped game record, mapping team names to our codes"""
+        return {
+            'home': self.team_mapping.get(home_team, home_team),
+            'away': self.team_mapping.get(away_team, away_team),
+            'home_score': home_score,
+            'away_score': away_score,
+            'home_team_full': home_team,
+            'away_team_full': away_team,
+            'scraped_at': datetime.now().isoformat()
+        }
+    
     def _parse_fallback(self, html_content):
         """Fallback parsing using regex"""
         games = []
         
         # Look for score patterns in text
-        patterns = [
-            r'([A-Za-z\s\.]+)\s+([A-Za-z\s\.]+)\s+(\d{2,3})(\d{2,3})',
-            r'([A-Za-z\s]+)\s+(\d{1,3})\s+([A-Za-z\s]+)\s+(\d{1,3})'
-        ]
-        
-        for pattern in patterns:
-            matches = re.findall(pattern, html_content)
+        for pattern in FALLBACK_PATTERNS:
+            matches = pattern.findall(html_content)
             for match in matches:
                 if len(match) == 4:
                     home_team = match[0].strip()
@@ -121,18 +320,7 @@ class FlashScoreScraper:
                     home_score = int(match[2])
                     away_score = int(match[3])
                     
-                    home_code = self.team_mapping.get(home_team, home_team)
-                    away_code = self.team_mapping.get(away_team, away_team)
-                    
-                    games.append({
-                        'home': home_code,
-                        'away': away_code,
-                        'home_score': home_score,
-                        'away_score': away_score,
-                        'home_team_full': home_team,
-                        'away_team_full': away_team,
-                        'scraped_at': datetime.now().isoformat()
-                    })
+                    games.append(self._make_game(home_team, away_team, home_score, away_score))
         
         return games[:20]  # Limit to 20 games
     
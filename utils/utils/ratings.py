@@ -2,15 +2,88 @@
 Rating system module for Elo-inspired NBL team ratings
 """
 
+import math
+import types
+import numpy as np
+from collections import namedtuple
 from datetime import datetime
 
+# Ratings are stored as float32; values leaving the class are rounded so
+# persisted/exported data doesn't carry float32 noise (1.04 -> 1.0399999618)
+RATING_DECIMALS = 6
+
+GameResult = namedtuple('GameResult', [
+    'timestamp', 'home', 'away', 'home_score', 'away_score',
+    'home_rating_before', 'away_rating_before',
+    'home_rating_after', 'away_rating_after',
+    'expected_mov', 'actual_mov', 'delta_rating',
+    'home_team_full', 'away_team_full', 'k', 'home_adv'
+])
+
+try:
+    from numba import njit
+except ImportError:  # numba is optional; fall back to plain Python
+    def njit(*args, **kwargs):
+        if args and callable(args[0]):
+            return args[0]
+        return lambda func: func
+
+@njit(cache=True)
+def _replay_kernel(r, idx_h, idx_a, mov, k, home_adv):
+    """Apply Elo updates for a sequence of games in place
+    
+    Arithmetic is done in float64 and stored back to float32, exactly as
+    in play_game, so a replay reproduces live ratings.
+    """
+    for i in range(len(mov)):
+        rh = float(r[idx_h[i]])
+        ra = float(r[idx_a[i]])
+        exp = rh + home_adv[i] - ra
+        d = k[i] * (mov[i] - exp)
+        r[idx_h[i]] = rh + d
+        r[idx_a[i]] = ra - d
+
 class RatingSystem:
     def __init__(self, initial_ratings=None, team_mapping=None, k=0.05, home_adv=2.2):
-        self.ratings = initial_ratings or {}
+        initial_ratings = initial_ratings or {}
         self.team_mapping = team_mapping or {}
         self.k = k  # K-factor for rating changes
         self.home_adv = home_adv  # Home court advantage
         self.game_history = []
+        
+        # Ratings live in parallel arrays (team names / float32 ratings)
+        self._teams = np.array(list(initial_ratings), dtype=object)
+        self._rvec = np.fromiter(initial_ratings.values(), dtype=np.float32,
+                                 count=len(initial_ratings))
+        self._idx = {team: i for i, team in enumerate(self._teams)}
+    
+    @property
+    def ratings(self):
+        """Read-only snapshot of the ratings as a team -> rating mapping"""
+        return types.MappingProxyType({
+            team: round(rating, RATING_DECIMALS)
+            for team, rating in zip(self._teams.tolist(), self._rvec.tolist())
+        })
+    
+    @property
+    def rating_values(self):
+        """Ratings of all teams as a NumPy array"""
+        return self._rvec
+    
+    def _rating(self, team):
+        """Current rating of a team, 0.0 if unknown"""
+        i = self._idx.get(team)
+        return 0.0 if i is None else float(self._rvec[i])
+    
+    def _team_index(self, team):
+        """Index of a team in the rating arrays, registering it if new"""
+        i = self._idx.get(team)
+        if i is None:
+            i = len(self._teams)
+            self._teams = np.append(self._teams, np.array([team], dtype=object))
+            self._rvec = np.append(self._rvec, np.zeros(1, dtype=self._rvec.dtype))
+            self._idx[team] = i
+        return i
     
     def expected_mov(self, home_rating, away_rating):
         """Expected margin of victory"""
@@ -22,57 +95,95 @@ class RatingSystem:
     
     def play_game(self, home, away, home_score, away_score):
         """Process a game and update ratings"""
-        home_rating = self.ratings.get(home, 0.0)
-        away_rating = self.ratings.get(away, 0.0)
+        home_rating = self._rating(home)
+        away_rating = self._rating(away)
         
         actual_mov = home_score - away_score
         exp_mov = self.expected_mov(home_rating, away_rating)
         dr = self.delta_rating(actual_mov, exp_mov)
         
         # Update ratings
-        self.ratings[home] = home_rating + dr
-        self.ratings[away] = away_rating - dr
+        i, j = self._team_index(home), self._team_index(away)
+        self._rvec[i] = home_rating + dr
+        self._rvec[j] = away_rating - dr
         
         # Record game
-        game_result = {
-            'timestamp': datetime.now().isoformat(),
-            'home': home,
-            'away': away,
-            'home_score': home_score,
-            'away_score': away_score,
-            'home_rating_before': home_rating,
-            'away_rating_before': away_rating,
-            'home_rating_after': self.ratings[home],
-            'away_rating_after': self.ratings[away],
-            'expected_mov': exp_mov,
-            'actual_mov': actual_mov,
-            'delta_rating': dr,
-            'home_team_full': self.team_mapping.get(home, home),
-            'away_team_full': self.team_mapping.get(away, away)
-        }
+        game_result = GameResult(
+            timestamp=datetime.now().isoformat(),
+            home=home,
+            away=away,
+            home_score=home_score,
+            away_score=away_score,
+            home_rating_before=round(home_rating, RATING_DECIMALS),
+            away_rating_before=round(away_rating, RATING_DECIMALS),
+            home_rating_after=round(float(self._rvec[i]), RATING_DECIMALS),
+            away_rating_after=round(float(self._rvec[j]), RATING_DECIMALS),
+            expected_mov=round(exp_mov, RATING_DECIMALS),
+            actual_mov=actual_mov,
+            delta_rating=round(dr, RATING_DECIMALS),
+            home_team_full=self.team_mapping.get(home, home),
+            away_team_full=self.team_mapping.get(away, away),
+            k=self.k,
+            home_adv=self.home_adv
+        )
         
         self.game_history.append(game_result)
         return game_result
     
+    def play_game_fast(self, home, away, home_score, away_score):
+        """Update ratings for a game without recording it; returns the rating change"""
+        i, j = self._team_index(home), self._team_index(away)
+        r = self._rvec
+        home_rating, away_rating = float(r[i]), float(r[j])
+        dr = self.k * (home_score - away_score - (home_rating + self.home_adv - away_rating))
+        r[i] = home_rating + dr
+        r[j] = away_rating - dr
+        return round(dr, RATING_DECIMALS)
+    
+    def replay_batch(self, df):
+        """Replay a DataFrame of games (home, away, home_score, away_score)
+        
+        Optional k / home_adv columns give the parameters each game was
+        played with; missing values use the current ones. The update loop is compiled with numba when it is installed (see
+        requirements.txt); by default it runs as plain Python.
+        """
+        if df.empty:
+            return
+        for team in dict.fromkeys([*df['home'], *df['away']]):
+            self._team_index(team)
+        
+        idx_h = df['home'].map(self._idx).to_numpy(np.int64)
+        idx_a = df['away'].map(self._idx).to_numpy(np.int64)
+        mov = (df['home_score'] - df['away_score']).to_numpy(np.float64)
+        k = self._game_param(df, 'k', self.k)
+        home_adv = self._game_param(df, 'home_adv', self.home_adv)
+        _replay_kernel(self._rvec, idx_h, idx_a, mov, k, home_adv)
+    
+    @staticmethod
+    def _game_param(df, column, default):
+        """Per-game parameter column as float64, filling gaps with the default"""
+        if column not in df:
+            return np.full(len(df), float(default))
+        return df[column].astype(np.float64).fillna(float(default)).to_numpy()
+    
     def get_standings(self):
         """Get current standings sorted by rating"""
-        return sorted(
-            [(self.team_mapping.get(team, team), rating) 
-             for team, rating in self.ratings.items()],
-            key=lambda x: x[1],
-            reverse=True
-        )
+        order = np.argsort(-self._rvec, kind='stable')
+        return [
+            (self.team_mapping.get(team, team), round(rating, RATING_DECIMALS))
+            for team, rating in zip(self._teams[order], self._rvec[order].tolist())
+        ]
     
     def get_team_rating(self, team):
         """Get rating for specific team"""
-        return self.ratings.get(team, 0.0)
+        return round(self._rating(team), RATING_DECIMALS)
     
     def predict_game(self, home, away):
         """Predict outcome of a future game"""
-        home_rating = self.ratings.get(home, 0.0)
-        away_rating = self.ratings.get(away, 0.0)
+        home_rating = self.get_team_rating(home)
+        away_rating = self.get_team_rating(away)
         
-        expected = self.expected_mov(home_rating, away_rating)
+        expected = round(self.expected_mov(home_rating, away_rating), RATING_DECIMALS)
         
         return {
             'home': home,
@@ -86,5 +197,10 @@ class RatingSystem:
     def _mov_to_probability(self, mov):
         """Convert margin of victory to win probability"""
         # Simple logistic function
-        import math
         return 1 / (1 + math.exp(-mov / 10))
+    
+    def predict_all(self):
+        """Home win probabilities for every pairing, indexed [home, away] by team order"""
+        r = self._rvec
+        mov = r[:, None] + self.home_adv - r[None, :]
+        return 1 / (1 + np.exp(-mov / 10))